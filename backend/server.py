@@ -3,130 +3,236 @@ import time
 import math
 import io
 import re
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import List, Optional
 import asyncio
 
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 import urllib3
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, Request, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 import os
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # Load environment variables
 load_dotenv()
 
 app = FastAPI()
 
+# How long a fetched /weather snapshot is reused before the upstream sources are queried again
+SNAPSHOT_TTL_SECONDS = 300
+
+# (rounded lat, rounded lon) -> (fetched_at, etag, last_modified, body)
+_snapshot_cache = {}
+
 class Location(BaseModel):
     lat: float
     lon: float
 
+class AirQuality(BaseModel):
+    aqi: Optional[int] = None
+    category: Optional[str] = None
+
+class FloodRisk(BaseModel):
+    distance_km: Optional[float] = None
+    current_level: Optional[str] = None
+    trend: Optional[str] = None
+
+class WeatherConditions(BaseModel):
+    conditions: List[str] = Field(default_factory=list)
+    temperature_celsius: Optional[float] = None
+    temperature_fahrenheit: Optional[float] = None
+
+class WeatherResponse(BaseModel):
+    timestamp: str
+    air_quality: AirQuality
+    flood_risk: FloodRisk
+    power_outage: Optional[bool] = None
+    weather: WeatherConditions
+
+def snapshot_etag(snapshot):
+    """
+    Build a weak ETag by hashing the snapshot contents. The timestamp is left out,
+    so a refetch that returns the same data keeps the same tag.
+    """
+    payload = snapshot.model_dump_json(exclude={"timestamp"}).encode()
+    return 'W/"' + hashlib.sha1(payload).hexdigest() + '"'
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
-@app.get("/weather")
-async def weather(latitude: float, longitude: float):
+@app.get("/weather", responses={
+    200: {"model": WeatherResponse},
+    304: {"description": "Snapshot unchanged since the ETag sent in If-None-Match"}
+})
+async def weather(latitude: float, longitude: float, request: Request):
     """Get weather and environmental data for a specific location"""
     try:
-        # Get current data
-        aqi_str = get_air_quality_forecast(latitude, longitude)
-        aqi_value = None
-        if aqi_str and ":" in aqi_str:
-            try:
-                aqi_value = int(aqi_str.split(": ")[1])
-            except (ValueError, IndexError):
-                pass
-        
-        # Get AQI category safely
-        aqi_category = None
-        if aqi_value is not None:
-            if aqi_value <= 50:
-                aqi_category = "Good"
-            elif aqi_value <= 100:
-                aqi_category = "Moderate"
-            elif aqi_value <= 150:
-                aqi_category = "Unhealthy for Sensitive Groups"
-            elif aqi_value <= 200:
-                aqi_category = "Unhealthy"
-            elif aqi_value <= 300:
-                aqi_category = "Very Unhealthy"
-            else:
-                aqi_category = "Hazardous"
-        
-        # Get flood risk data safely
-        flood_data = {
-            "distance_km": None,
-            "current_level": None,
-            "trend": None
-        }
-        try:
-            flood_info = check_location_flood_risk(latitude, longitude)
-            if flood_info:
-                flood_parts = flood_info.split(", ")
-                if len(flood_parts) >= 3:
-                    try:
-                        flood_data["distance_km"] = float(flood_parts[0].split(": ")[1].split()[0])
-                    except (ValueError, IndexError):
-                        pass
-                    try:
-                        flood_data["current_level"] = flood_parts[1].split(": ")[1]
-                    except IndexError:
-                        pass
-                    try:
-                        flood_data["trend"] = flood_parts[2].split(": ")[1]
-                    except IndexError:
-                        pass
-        except Exception:
-            pass
-        
-        # Get weather data safely
-        weather_data = {
-            "conditions": [],
-            "temperature_celsius": None,
-            "temperature_fahrenheit": None
-        }
-        try:
-            weather_str = getWeatherAndTemp(latitude, longitude)
-            if weather_str:
-                weather_parts = weather_str.split("and the temperature is ")
-                if len(weather_parts) > 0:
-                    conditions_str = weather_parts[0].replace("Weathers include: ", "")
-                    weather_data["conditions"] = [w.strip() for w in conditions_str.split(",") if w.strip() and w.strip() != "None"]
-                
-                if len(weather_parts) > 1:
-                    try:
-                        temp_c = float(weather_parts[1])
-                        weather_data["temperature_celsius"] = temp_c
-                        weather_data["temperature_fahrenheit"] = round(temp_c * 9/5 + 32, 2)
-                    except (ValueError, IndexError):
-                        pass
-        except Exception:
-            pass
-        
-        # Get power outage status safely
-        power_outage = None
+        etag, last_modified, body = get_weather_snapshot(latitude, longitude)
+
+        # Client already has this snapshot version: send no body. Last-Modified
+        # carries the snapshot's build time so the client can refresh its timestamp
+        headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+    except Exception as e:
+        return JSONResponse({"error": str(e)})
+
+def get_weather_snapshot(latitude, longitude):
+    """
+    Return (etag, last_modified, body) for a location, reusing a cached snapshot
+    for up to SNAPSHOT_TTL_SECONDS so repeat polls skip the upstream fetches.
+
+    Coordinates are rounded to 3 decimals (~100 m) so small GPS jitter from the
+    same device still hits the cache. The ETag is the snapshot version: a hash of
+    its contents computed once when the snapshot is built. The body is serialized
+    once here and reused for every 200. Snapshots where an upstream source failed
+    are not cached, so the next poll retries right away.
+    """
+    key = (round(latitude, 3), round(longitude, 3))
+    now = time.monotonic()
+    cached = _snapshot_cache.get(key)
+    if cached and now - cached[0] < SNAPSHOT_TTL_SECONDS:
+        return cached[1:]
+
+    snapshot, complete = build_weather_snapshot(latitude, longitude)
+    etag = snapshot_etag(snapshot)
+    built_at = datetime.fromisoformat(snapshot.timestamp.rstrip("Z")).replace(tzinfo=timezone.utc)
+    last_modified = format_datetime(built_at, usegmt=True)
+    body = snapshot.model_dump_json().encode()
+    if not complete:
+        return etag, last_modified, body
+
+    # Drop expired entries so the cache doesn't grow with every location seen
+    for stale_key in [k for k, v in _snapshot_cache.items() if now - v[0] >= SNAPSHOT_TTL_SECONDS]:
+        del _snapshot_cache[stale_key]
+    _snapshot_cache[key] = (now, etag, last_modified, body)
+    return etag, last_modified, body
+
+def build_weather_snapshot(latitude, longitude):
+    """
+    Query every upstream source and assemble a WeatherResponse for the location.
+    Returns (snapshot, complete) where complete is False if any source failed.
+    """
+    complete = True
+
+    # Get current data
+    aqi_str = get_air_quality_forecast(latitude, longitude)
+    if not isinstance(aqi_str, str):
+        complete = False
+    aqi_value = None
+    if aqi_str and ":" in aqi_str:
         try:
-            power_outage = long_lat_power_outage(latitude, longitude)
-        except Exception:
+            aqi_value = int(aqi_str.split(": ")[1])
+        except (ValueError, IndexError):
             pass
-        
-        data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "air_quality": {
-                "aqi": aqi_value,
-                "category": aqi_category
-            },
-            "flood_risk": flood_data,
-            "power_outage": power_outage,
-            "weather": weather_data
-        }
-        return data
-    except Exception as e:
-        return {"error": str(e)}
+    
+    # Get AQI category safely
+    aqi_category = None
+    if aqi_value is not None:
+        if aqi_value <= 50:
+            aqi_category = "Good"
+        elif aqi_value <= 100:
+            aqi_category = "Moderate"
+        elif aqi_value <= 150:
+            aqi_category = "Unhealthy for Sensitive Groups"
+        elif aqi_value <= 200:
+            aqi_category = "Unhealthy"
+        elif aqi_value <= 300:
+            aqi_category = "Very Unhealthy"
+        else:
+            aqi_category = "Hazardous"
+    
+    # Get flood risk data safely
+    flood_data = {
+        "distance_km": None,
+        "current_level": None,
+        "trend": None
+    }
+    try:
+        flood_info = check_location_flood_risk(latitude, longitude)
+        if flood_info:
+            flood_parts = flood_info.split(", ")
+            if len(flood_parts) >= 3:
+                try:
+                    flood_data["distance_km"] = float(flood_parts[0].split(": ")[1].split()[0])
+                except (ValueError, IndexError):
+                    pass
+                try:
+                    flood_data["current_level"] = flood_parts[1].split(": ")[1]
+                except IndexError:
+                    pass
+                try:
+                    flood_data["trend"] = flood_parts[2].split(": ")[1]
+                except IndexError:
+                    pass
+    except Exception:
+        complete = False
+    
+    # Get weather data safely
+    weather_data = {
+        "conditions": [],
+        "temperature_celsius": None,
+        "temperature_fahrenheit": None
+    }
+    try:
+        weather_str = getWeatherAndTemp(latitude, longitude)
+        if not weather_str:
+            complete = False
+        else:
+            weather_parts = weather_str.split("and the temperature is ")
+            if len(weather_parts) > 0:
+                conditions_str = weather_parts[0].replace("Weathers include: ", "")
+                weather_data["conditions"] = [w.strip() for w in conditions_str.split(",") if w.strip() and w.strip() != "None"]
+            
+            if len(weather_parts) > 1:
+                try:
+                    temp_c = float(weather_parts[1])
+                    weather_data["temperature_celsius"] = temp_c
+                    weather_data["temperature_fahrenheit"] = round(temp_c * 9/5 + 32, 2)
+                except (ValueError, IndexError):
+                    pass
+    except Exception:
+        complete = False
+    
+    # Get power outage status safely
+    power_outage = None
+    try:
+        power_outage = long_lat_power_outage(latitude, longitude)
+    except Exception:
+        complete = False
+    
+    snapshot = WeatherResponse(
+        timestamp=datetime.utcnow().isoformat() + "Z",
+        air_quality=AirQuality(aqi=aqi_value, category=aqi_category),
+        flood_risk=FloodRisk(**flood_data),
+        power_outage=power_outage,
+        weather=WeatherConditions(**weather_data)
+    )
+    return snapshot, complete
 
 
 
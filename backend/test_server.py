@@ -0,0 +1,120 @@
+import asyncio
+
+from fastapi import Request
+
+import server
+
+
+def make_snapshot(aqi=42):
+    return server.WeatherResponse(
+        timestamp="2024-01-01T00:00:00Z",
+        air_quality=server.AirQuality(aqi=aqi, category="Good"),
+        flood_risk=server.FloodRisk(),
+        power_outage=False,
+        weather=server.WeatherConditions(conditions=["rain"], temperature_celsius=10.0)
+    )
+
+
+def make_request(if_none_match=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/weather", "headers": headers})
+
+
+def stub_upstream(monkeypatch, snapshot, complete=True):
+    calls = []
+
+    def fake_build(latitude, longitude):
+        calls.append((latitude, longitude))
+        return snapshot, complete
+
+    monkeypatch.setattr(server, "build_weather_snapshot", fake_build)
+    monkeypatch.setattr(server, "_snapshot_cache", {})
+    return calls
+
+
+def test_etag_matches_wildcard_and_lists():
+    etag = 'W/"abc"'
+    assert server.etag_matches("*", etag)
+    assert server.etag_matches('"xyz", W/"abc"', etag)
+    assert not server.etag_matches('"xyz", "def"', etag)
+    assert not server.etag_matches(None, etag)
+    assert not server.etag_matches("", etag)
+
+
+def test_etag_matches_weak_and_strong():
+    assert server.etag_matches('"abc"', 'W/"abc"')
+    assert server.etag_matches('W/"abc"', '"abc"')
+    assert not server.etag_matches('W/"abd"', 'W/"abc"')
+
+
+def test_snapshot_etag_ignores_timestamp():
+    first = make_snapshot()
+    second = first.model_copy(update={"timestamp": "2024-01-02T00:00:00Z"})
+    assert server.snapshot_etag(first) == server.snapshot_etag(second)
+    assert server.snapshot_etag(first) != server.snapshot_etag(make_snapshot(aqi=150))
+
+
+def test_weather_returns_body_and_etag(monkeypatch):
+    snapshot = make_snapshot()
+    stub_upstream(monkeypatch, snapshot)
+
+    response = asyncio.run(server.weather(47.59, -122.12, make_request()))
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == server.snapshot_etag(snapshot)
+    assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert response.body == snapshot.model_dump_json().encode()
+
+
+def test_weather_returns_304_from_cached_snapshot(monkeypatch):
+    calls = stub_upstream(monkeypatch, make_snapshot())
+
+    first = asyncio.run(server.weather(47.59, -122.12, make_request()))
+    second = asyncio.run(server.weather(47.59, -122.12, make_request(first.headers["etag"])))
+
+    assert second.status_code == 304
+    assert second.body == b""
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["last-modified"] == first.headers["last-modified"]
+    assert len(calls) == 1
+
+
+def test_weather_does_not_cache_degraded_snapshot(monkeypatch):
+    calls = stub_upstream(monkeypatch, make_snapshot(aqi=None), complete=False)
+
+    asyncio.run(server.weather(47.59, -122.12, make_request()))
+    asyncio.run(server.weather(47.59011, -122.12, make_request()))
+
+    assert len(calls) == 2
+    assert server._snapshot_cache == {}
+
+
+def test_build_weather_snapshot_flags_failed_sources(monkeypatch):
+    def fail(latitude, longitude):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(server, "get_air_quality_forecast", lambda latitude, longitude: "AQI: 20")
+    monkeypatch.setattr(server, "check_location_flood_risk", fail)
+    monkeypatch.setattr(server, "getWeatherAndTemp", lambda latitude, longitude: "")
+    monkeypatch.setattr(server, "long_lat_power_outage", fail)
+
+    snapshot, complete = server.build_weather_snapshot(47.59, -122.12)
+
+    assert not complete
+    assert snapshot.air_quality.aqi == 20
+    assert snapshot.power_outage is None
+
+
+def test_weather_error_keeps_error_body(monkeypatch):
+    def failing_build(latitude, longitude):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(server, "build_weather_snapshot", failing_build)
+    monkeypatch.setattr(server, "_snapshot_cache", {})
+
+    response = asyncio.run(server.weather(47.59, -122.12, make_request()))
+
+    assert response.status_code == 200
+    assert response.body == b'{"error":"upstream down"}'
@@ -10,6 +10,7 @@ interface EnvironmentalData {
 }
 
 const STORAGE_KEY = '@environmental_data';
+const ETAG_STORAGE_KEY = '@environmental_data_etag';
 const API_BASE_URL = 'http://35.93.197.32:8000/weather';
 
 export const fetchAndStoreEnvironmentalData = async (latitude: number, longitude: number): Promise<void> => {
@@ -17,8 +18,24 @@ export const fetchAndStoreEnvironmentalData = async (latitude: number, longitude
     const url = `${API_BASE_URL}?latitude=${latitude}&longitude=${longitude}`;
     console.log('Making API call to:', url);
     
-    const response = await fetch(url);
+    // Send the last ETag (only if we still have the matching data) so the server can answer 304
+    const stored = await AsyncStorage.getItem(STORAGE_KEY);
+    const etag = stored ? await AsyncStorage.getItem(ETAG_STORAGE_KEY) : null;
+    const response = await fetch(url, etag ? { headers: { 'If-None-Match': etag } } : undefined);
     
+    if (response.status === 304 && stored) {
+      // Data unchanged: keep the stored copy, taking the build time of the server's
+      // current snapshot so the timestamp means the same as in a 200 body
+      const lastModified = response.headers.get('Last-Modified');
+      if (lastModified) {
+        const data: EnvironmentalData = JSON.parse(stored);
+        data.timestamp = new Date(lastModified).toISOString();
+        await AsyncStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+      }
+      console.log('Environmental data unchanged, keeping stored copy');
+      return;
+    }
+
     if (!response.ok) {
       throw new Error('Network response was not ok');
     }
@@ -26,8 +43,15 @@ export const fetchAndStoreEnvironmentalData = async (latitude: number, longitude
     const data: EnvironmentalData = await response.json();
     console.log('API Response:', JSON.stringify(data, null, 2));
     
-    // Store the data locally
-    await AsyncStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+    // Store the data locally, replacing or dropping the ETag along with it so a
+    // tag never outlives the data it describes (error bodies carry no ETag)
+    const newEtag = response.headers.get('ETag');
+    if (newEtag) {
+      await AsyncStorage.multiSet([[STORAGE_KEY, JSON.stringify(data)], [ETAG_STORAGE_KEY, newEtag]]);
+    } else {
+      await AsyncStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+      await AsyncStorage.removeItem(ETAG_STORAGE_KEY);
+    }
     console.log('Environmental data stored successfully');
   } catch (error) {
     console.error('Error fetching and storing environmental data:', error);